@@ -34,6 +34,17 @@ class ViewPort:
             **{k: v() for k, v in self.parms_link.items()}
         }
 
+    def get(self, name: str, default: Any = None) -> Any:
+        """
+        Returns a single parameter with the same precedence as parms
+        (links, then values, then environment) without building the whole dict.
+        """
+        if name in self.parms_link:
+            return self.parms_link[name]()
+        if name in self.parms_value:
+            return self.parms_value[name]
+        return os.environ.get(name, default)
+
     def set_(self, name: str, value: Any, link: bool = False):
         """
         Sets a parameter.
@@ -3,9 +3,12 @@ from .ViewPort import ViewPort
 import shutil as sh
 from pathlib import Path
 from typing import Optional, List, Any
-from .encoding_utils import check_bom,detect_encoding,determine_minimal_encoding
+from .encoding_utils import check_bom,detect_encoding,detect_bytes_encoding,decode_text,determine_minimal_encoding
 from .file_utils import copy, mkdir, mkfile, rmfile, rmdir, make_archive, extract_archive, chmod, nano, make, remove, ls
 
+# Самый длинный BOM (UTF-32) — 4 байта
+_MAX_BOM_SIZE = 4
+
 class CMD:
     """
     Класс CMD — основной интерфейс для работы с файлами, текстом и директориями.
@@ -16,6 +19,8 @@ class CMD:
         Базовый класс для представления содержимого (текста или файла).
         Позволяет использовать операторы для передачи содержимого между объектами.
         """
+        # Без __dict__: объекты создаются на каждый file()/text(), слоты задают наследники
+        __slots__ = ()
         content: str
         encoding: str
         _cmd: 'CMD|None' = None
@@ -52,8 +57,7 @@ class CMD:
             """
             if not isinstance(other, CMD._Content) or isinstance(other, CMD._files):
                 raise TypeError(f">>: Ожидался наследник _Content и не _files, а не {type(other).__name__}")
-            sep = other._cmd.sep if other._cmd is not None and other.content != "" else ""
-            other.content = other.content + sep + self.content
+            other.append(self.content)
             return self._cmd
 
         def __lshift__(self, other):
@@ -62,8 +66,17 @@ class CMD:
             """
             if not isinstance(other, CMD._Content) or isinstance(self, CMD._files):
                 raise TypeError(f"<<: Ожидался наследник _Content и не _files, а не self: {type(self).__name__}, other: {type(other).__name__}")
+            self.append(other.content)
+            return self._cmd
+
+        def append(self, value: str) -> "CMD|None":
+            """
+            Добавляет строку в конец содержимого (через разделитель sep, если содержимое не пустое).
+            :param value: Добавляемый текст
+            :return: self._cmd для цепочек вызовов
+            """
             sep = self._cmd.parms["sep"] if self._cmd is not None and self.content != "" else ""
-            self.content = self.content + sep + other.content
+            self.content = self.content + sep + value
             return self._cmd
 
     class _file(_Content):
@@ -71,10 +84,14 @@ class CMD:
         Класс для работы с отдельным файлом.
         Позволяет читать, записывать, очищать содержимое и перекодировать файл.
         """
+        __slots__ = ('path', 'encoding', '_cmd', '_encoding_known')
+
         def __init__(self, path: Path | str, encoding: str = 'utf-8', _cmd: 'CMD|None' = None):
             self.path = Path(path)
             self.encoding = encoding
             self._cmd = _cmd
+            # encoding — лишь подсказка, пока этот объект сам не записал или не перекодировал файл
+            self._encoding_known = False
         
         def __str__(self) -> str:
             """Возвращает путь к файлу в виде строки."""
@@ -87,11 +104,11 @@ class CMD:
         @property
         def content(self) -> str:
             """Содержимое файла как строка (автоматически определяет кодировку при ошибке)."""
+            data = self.path.read_bytes()
             try:
-                return self.path.read_text(encoding=self.encoding)
+                return decode_text(data, self.encoding)
             except UnicodeDecodeError:
-                enc = detect_encoding(self.path)
-                return self.path.read_text(encoding=enc)
+                return decode_text(data, detect_bytes_encoding(data))
 
         @content.setter
         def content(self, value: str):
@@ -100,6 +117,7 @@ class CMD:
             try:
                 self.path.write_text(value, encoding=min_encoding)
                 self.encoding = min_encoding  # Обновляем кодировку файла
+                self._encoding_known = True
             except Exception as e:
                 raise IOError(f"Не удалось записать в '{self.path}': {e}")
 
@@ -111,6 +129,36 @@ class CMD:
             except Exception as e:
                 raise IOError(f"Не удалось очистить '{self.path}': {e}")
 
+        def append(self, value: str) -> "CMD|None":
+            """
+            Дописывает строку в конец файла без перечитывания и перезаписи всего файла.
+            Быстрый путь используется, только если файл записан или перекодирован этим
+            объектом и его кодировка достоверно известна; иначе, а также если текст в ней
+            не кодируется, файл перечитывается и перезаписывается целиком.
+            :param value: Добавляемый текст
+            :return: self._cmd для цепочек вызовов
+            """
+            try:
+                size = self.path.stat().st_size
+            except FileNotFoundError:
+                size = 0
+            if not size:
+                self.content = value
+                return self._cmd
+            # Файл не длиннее BOM может быть пустым по содержимому — тогда разделитель не нужен
+            if size <= _MAX_BOM_SIZE or not self._encoding_known:
+                return super().append(value)
+            sep = self._cmd.parms["sep"] if self._cmd is not None else ""
+            try:
+                # Текстовый режим переводит '\n' как write_text и не пишет BOM в середину файла
+                with self.path.open('a', encoding=self.encoding) as f:
+                    f.write(sep + value)
+            except (LookupError, UnicodeEncodeError):
+                return super().append(value)
+            except Exception as e:
+                raise IOError(f"Не удалось дописать в '{self.path}': {e}")
+            return self._cmd
+
         def recode(self, to_encoding: Optional[str] = None, from_encoding: Optional[str] = None) -> "CMD|None":
             """
             Перекодирует файл в другую кодировку.
@@ -119,18 +167,20 @@ class CMD:
             :return: self._cmd для цепочек вызовов
             """
             try:
-                if to_encoding is None:
-                        to_encoding = determine_minimal_encoding(self.path)
+                # Файл читается один раз; определение кодировки работает по уже прочитанным байтам
+                data = self.path.read_bytes()
                 if from_encoding is None:
                     try:
-                        content = self.path.read_text(encoding=self.encoding)
+                        content = decode_text(data, self.encoding)
                     except UnicodeDecodeError:
-                        detected_encoding = detect_encoding(self.path)
-                        content = self.path.read_text(encoding=detected_encoding)
+                        content = decode_text(data, detect_bytes_encoding(data))
                 else:
-                    content = self.path.read_text(encoding=from_encoding)
+                    content = decode_text(data, from_encoding)
+                if to_encoding is None:
+                    to_encoding = determine_minimal_encoding(content)
                 self.path.write_text(content, encoding=to_encoding)
                 self.encoding = to_encoding
+                self._encoding_known = True
                 return self._cmd
             except Exception as e:
                 raise IOError(f"Ошибка перекодировки файла '{self.path}': {e}")
@@ -140,6 +190,8 @@ class CMD:
         Класс для работы с группой файлов.
         Позволяет читать содержимое всех файлов как единую строку, очищать их.
         """
+        __slots__ = ('_file_objects', 'encoding', '_cmd')
+
         def __init__(self, *args: Any, encoding: str = 'utf-8', _cmd: 'CMD|None' = None):
             self._file_objects = []
             for arg in args:
@@ -167,7 +219,7 @@ class CMD:
             contents = []
             for file_obj in self._file_objects:
                 contents.append(file_obj.content)
-            sep = self._cmd.sep if self._cmd is not None else ""
+            sep = self._cmd.parms["sep"] if self._cmd is not None else ""
             return sep.join(contents)
 
         @content.setter
@@ -190,6 +242,8 @@ class CMD:
         """
         Класс для работы с текстом в памяти (без файловой системы).
         """
+        __slots__ = ('content', 'encoding', '_cmd')
+
         def __init__(self, content: str = "", encoding: str = 'utf-8', _cmd: 'CMD|None' = None):
             self.content = content
             self.encoding = encoding
@@ -233,7 +287,7 @@ class CMD:
         :param encoding: Кодировка (по умолчанию — default_encoding)
         :return: объект _files
         """
-        enc = encoding or self.default_encoding
+        enc = encoding or self.parms["default_encoding"]
         return CMD._files(*args, encoding=enc, _cmd=self)
 
     
@@ -282,8 +336,8 @@ class CMD:
         for part in parts:
             if len(part) >= 3 and part.startswith('%') and part.endswith('%'):
                 var_name = part[1:-1]
-                if var_name in self.getenv:
-                    new_path = new_path / Path(self.getenv[var_name])
+                if var_name in self.parms:
+                    new_path = new_path / Path(self.parms.get(var_name))
                 else:
                     new_path = new_path / part
             elif part == '~':
@@ -387,7 +441,7 @@ class CMD:
         rmdir(path, ignore_errors=ignore_errors, onerror=onerror)
         return self
 
-    def make_archive(self, from_path: str | Path, to_path: str | Path | None = None, format: str = "zip", owner: Optional[str] = None, group: Optional[str] = None, ignore_errors: bool = False):
+    def make_archive(self, from_path: str | Path, to_path: str | Path | None = None, format: str = "zip", owner: Optional[str] = None, group: Optional[str] = None, compresslevel: Optional[int] = None, ignore_errors: bool = False):
         """
         Создаёт архив из файла или директории.
         :param from_path: Что архивировать
@@ -395,6 +449,7 @@ class CMD:
         :param format: Формат архива (zip, tar и др.)
         :param owner: Владелец (опционально)
         :param group: Группа (опционально)
+        :param compresslevel: Уровень сжатия: zip, gztar, xztar — 0–9, bztar — 1–9 (по умолчанию 1 для zip/gztar, 9 для bztar, 6 для xztar; игнорируется при owner/group)
         :param ignore_errors: Игнорировать ошибки
         :return: self
         """
@@ -405,7 +460,7 @@ class CMD:
         else:
             to_path = self.to_abspath(to_path)
         try:
-            make_archive(from_path, to_path, format=format, owner=owner, group=group)
+            make_archive(from_path, to_path, format=format, owner=owner, group=group, compresslevel=compresslevel)
         except Exception:
             if not ignore_errors:
                 raise
@@ -465,21 +520,24 @@ class CMD:
                 raise
         return self
     
-    def nano(self, path: str | Path, edit_txt="notepad", ignore_errors: bool = False):
+    def nano(self, path: str | Path, edit_txt: Optional[str] = None, wait: bool = True, ignore_errors: bool = False):
         """
         Открывает файл в текстовом редакторе.
         :param path: Путь к файлу
-        :param edit_txt: Имя редактора (по умолчанию notepad)
+        :param edit_txt: Команда редактора (по умолчанию $VISUAL/$EDITOR, иначе notepad в Windows и nano в остальных ОС)
+        :param wait: Ждать закрытия редактора (False — открыть и сразу вернуться)
         :param ignore_errors: Игнорировать ошибки
-        :return: self
+        :return: self; при wait=False — процесс редактора (subprocess.Popen), который нужно дождаться через wait(),
+                 или None, если запуск не удался и ignore_errors=True
         """
         path = self.to_abspath(path)
         try:
-            nano(path, edit_txt=edit_txt)
+            proc = nano(path, edit_txt=edit_txt, wait=wait)
         except Exception:
             if not ignore_errors:
                 raise
-        return self
+            return self if wait else None
+        return self if wait else proc
 
     def remove(self, path: str | Path, ignore_errors: bool = False):
         """
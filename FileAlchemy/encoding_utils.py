@@ -1,64 +1,113 @@
+import os
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Callable
+from functools import lru_cache
+
+_BOMS = {
+    b'\xEF\xBB\xBF': 'utf-8-sig',  # UTF-8 BOM
+    b'\xFF\xFE': 'utf-16',          # UTF-16 LE BOM
+    b'\xFE\xFF': 'utf-16',          # UTF-16 BE BOM
+}
 
 def check_bom(data: bytes) -> Optional[str]:
     """
     Checks the byte order mark (BOM) at the start of the byte sequence.
     Returns the corresponding encoding if BOM is found, otherwise None.
     """
-    if data.startswith(b'\xEF\xBB\xBF'):  # UTF-8 BOM
-        return 'utf-8-sig'
-    if data.startswith(b'\xFF\xFE'):      # UTF-16 LE BOM
-        return 'utf-16'
-    if data.startswith(b'\xFE\xFF'):      # UTF-16 BE BOM
-        return 'utf-16'
-    return None
+    head = bytes(data[:3])
+    return _BOMS.get(head) or _BOMS.get(head[:2])
 
-def detect_encoding(path: Path | str, sample_size: int = 65536) -> str:
+@lru_cache(maxsize=None)
+def _load_detector() -> Callable[[bytes], dict]:
+    """
+    Returns the fastest available chardet-compatible detect() function.
+    Prefers cchardet (C, uchardet), then charset_normalizer, then chardet.
     """
-    Detects the encoding of a file by reading up to sample_size bytes.
-    Checks BOM first, then uses chardet library for detection.
+    try:
+        import cchardet
+        return cchardet.detect
+    except ImportError:
+        pass
+    try:
+        from charset_normalizer import detect
+        return detect
+    except ImportError:
+        pass
+    import chardet
+    return chardet.detect
+
+def detect_bytes_encoding(data: bytes, sample_size: int = 65536) -> str:
+    """
+    Detects the encoding of already-read bytes, looking at up to sample_size of them.
+    Checks BOM first, then uses the fastest installed detector
+    (cchardet, charset_normalizer or chardet).
     Falls back to 'utf-8' if confidence is low or detection fails.
-    
-    Raises ImportError if chardet is not installed.
+
+    Raises ImportError if no detector is installed.
     """
-    path = Path(path)
+    data = data[:sample_size]
+
+    # Check for BOM first
+    if bom_encoding := check_bom(data):
+        return bom_encoding
+
     try:
-        import chardet
-        
-        with path.open('rb') as f:
-            raw_data = f.read(sample_size)
-            
-        # Check for BOM first
-        if bom_encoding := check_bom(raw_data):
-            return bom_encoding
-        
-        # Detect encoding using chardet
-        result = chardet.detect(raw_data)
-        
-        # Use utf-8 if confidence is below threshold
-        if result['confidence'] < 0.7:
-            return 'utf-8'
-            
-        return result['encoding'] or 'utf-8'
+        detect = _load_detector()
     except ImportError:
         raise ImportError("For automatic encoding detection, please install chardet")
 
+    result = detect(data)
+
+    # Use utf-8 if confidence is below threshold
+    if (result['confidence'] or 0) < 0.7:
+        return 'utf-8'
+
+    return result['encoding'] or 'utf-8'
+
+def detect_encoding(path: Path | str, sample_size: int = 65536) -> str:
+    """
+    Detects the encoding of a file by reading up to sample_size bytes
+    (see detect_bytes_encoding).
+    Results are cached until the file's size or modification time changes.
+    
+    Raises ImportError if no detector is installed.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    return _detect_file_encoding(path, st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size, sample_size)
+
+@lru_cache(maxsize=256)
+def _detect_file_encoding(path: str, dev: int, ino: int, mtime_ns: int, size: int, sample_size: int) -> str:
+    # dev/ino/mtime_ns/size only take part in the cache key
+    with open(path, 'rb') as f:
+        raw_data = f.read(sample_size)
+    return detect_bytes_encoding(raw_data, sample_size)
+
+def decode_text(data: bytes, encoding: str) -> str:
+    """
+    Decodes bytes the way Path.read_text does, including universal newline translation.
+    """
+    text = data.decode(encoding)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+# Highest code point representable in cp1251 ('™', U+2122)
+_CP1251_MAX_CHAR = '\u2122'
+
 def determine_minimal_encoding(content: str) -> str:
     """
     Determines the minimal encoding that can represent the given string content.
     Tries ASCII, then Windows-1251 (Cyrillic), then defaults to UTF-8.
     """
-    try:
-        content.encode('ascii')
+    if content.isascii():
         return 'ascii'
-    except UnicodeEncodeError:
-        pass
-    
-    try:
-        content.encode('cp1251')
-        return 'cp1251'
-    except UnicodeEncodeError:
-        pass
+
+    if max(content) <= _CP1251_MAX_CHAR:
+        try:
+            content.encode('cp1251')
+            return 'cp1251'
+        except UnicodeEncodeError:
+            pass
     
     return 'utf-8'
@@ -2,20 +2,100 @@ import shutil as sh
 import os
 import platform
 import subprocess
+import shlex
 from pathlib import Path
 from typing import Optional
-import sys
 import time
 import stat as statmod
+import tarfile
+import zipfile
+from functools import lru_cache
+
+# The OS never changes during the process lifetime; platform.system() is not free
+_SYSTEM = platform.system()
+_IS_WINDOWS = _SYSTEM == "Windows"
+_EDITORS = {"Windows": "notepad", "Linux": "nano", "Darwin": "nano"}
+
+try:
+    from isal import igzip as _igzip, isal_zlib as _isal_zlib
+except ImportError:
+    _igzip = _isal_zlib = None
+
+if _IS_WINDOWS:
+    import getpass
+    import ctypes
+    from ctypes import wintypes
+    # A private WinDLL keeps argtypes off the shared windll.kernel32 and preserves GetLastError
+    _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    _CopyFileExW = _kernel32.CopyFileExW
+    _CopyFileExW.argtypes = [wintypes.LPCWSTR, wintypes.LPCWSTR, ctypes.c_void_p,
+                             ctypes.c_void_p, ctypes.c_void_p, wintypes.DWORD]
+    _CopyFileExW.restype = wintypes.BOOL
+else:
+    import pwd, grp
+    _CopyFileExW = None
+
+_COPY_CHUNK = 1 << 30
+# tarfile copies members in 16 KiB reads and flushes streams in 10 KiB records by default
+_COPY_BUFSIZE = 1 << 20
+
+def _copy_file_range(from_path: Path, to_path: Path) -> bool:
+    """Copies file data with os.copy_file_range. Returns False if the kernel/filesystem can't do it."""
+    with open(from_path, 'rb') as fsrc, open(to_path, 'wb') as fdst:
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        copied = 0
+        while True:
+            try:
+                n = os.copy_file_range(src_fd, dst_fd, _COPY_CHUNK)
+            except OSError:
+                if copied:
+                    raise
+                return False
+            if n == 0:
+                # Empty sources, procfs and old cross-device kernels report 0 instead of failing
+                return copied > 0
+            copied += n
+
+def _copyfile(from_path: Path, to_path: Path):
+    """Copies file contents, letting the kernel move the data where the platform allows."""
+    if to_path.exists() and os.path.samefile(from_path, to_path):
+        raise sh.SameFileError(f"'{from_path}' and '{to_path}' are the same file")
+    # Opening a FIFO blocks until a writer appears; shutil refuses such sources the same way
+    if not statmod.S_ISREG(os.stat(from_path).st_mode):
+        raise sh.SpecialFileError(f"'{from_path}' is not a regular file")
+    if _CopyFileExW is not None:
+        if not _CopyFileExW(str(from_path), str(to_path), None, None, None, 0):
+            raise ctypes.WinError(ctypes.get_last_error())
+        return
+    if hasattr(os, 'copy_file_range') and _copy_file_range(from_path, to_path):
+        return
+    sh.copyfile(from_path, to_path)
+
+def _copy2(from_path: Path, to_path: Path, follow_symlinks: bool = True):
+    """Same contract as shutil.copy2, but copies the data via _copyfile."""
+    if to_path.is_dir():
+        to_path = to_path / from_path.name
+    if not follow_symlinks and from_path.is_symlink():
+        return sh.copy2(from_path, to_path, follow_symlinks=False)
+    _copyfile(from_path, to_path)
+    sh.copystat(from_path, to_path)
+    return to_path
+
+def _copytree_copy(src: str, dst: str):
+    # copytree passes plain strings and has already resolved symlinks
+    return _copy2(Path(src), Path(dst))
 
 def copy(from_path: Path, to_path: Path, follow_symlinks: bool = True):
     """Copies a file or directory."""
-    if not from_path.exists():
-        raise FileNotFoundError(f"Source path '{from_path}' does not exist.")
-    if from_path.is_file():
-        sh.copy2(from_path, to_path, follow_symlinks=follow_symlinks)
-    elif from_path.is_dir():
-        sh.copytree(from_path, to_path, dirs_exist_ok=True, symlinks=not follow_symlinks)
+    try:
+        mode = from_path.stat().st_mode
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Source path '{from_path}' does not exist.") from None
+    if statmod.S_ISREG(mode):
+        _copy2(from_path, to_path, follow_symlinks=follow_symlinks)
+    elif statmod.S_ISDIR(mode):
+        sh.copytree(from_path, to_path, dirs_exist_ok=True, symlinks=not follow_symlinks,
+                    copy_function=_copytree_copy)
     else:
         raise ValueError(f"'{from_path}' is not a valid file or directory.")
 
@@ -36,51 +116,203 @@ def rmdir(path: Path, ignore_errors: bool = False, onerror=None):
     The ignore_errors and onerror parameters are passed through."""
     sh.rmtree(path, ignore_errors=ignore_errors, onerror=onerror)
 
-def make_archive(from_path: Path, to_path: Path, format: str = "zip", owner: Optional[str] = None, group: Optional[str] = None):
-    """Creates an archive from a directory or file."""
+def _make_zip(from_path: Path, archive_path: Path, is_dir: bool, compresslevel: int = 1):
+    """Writes from_path into a zip archive, laid out like shutil.make_archive(root_dir=parent, base_dir=name)."""
+    # Every walked path starts with root + separator, so arcnames are plain slices
+    root = os.path.join(str(from_path.parent), '')
+    root_len = len(root)
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED,
+                         allowZip64=True, compresslevel=compresslevel) as zf:
+        zf.write(from_path, from_path.name)
+        if not is_dir:
+            return
+        for dirpath, dirnames, filenames in os.walk(root + from_path.name):
+            for name in sorted(dirnames):
+                path = os.path.join(dirpath, name)
+                zf.write(path, path[root_len:])
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if os.path.isfile(path):
+                    zf.write(path, path[root_len:])
+
+def _make_tar_piped(from_path: Path, archive_path: Path, command: list):
+    """Streams an uncompressed tar of from_path into an external compressor writing archive_path.
+    A partial archive is removed if either side fails."""
+    try:
+        with open(archive_path, 'wb') as out:
+            proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=out, bufsize=_COPY_BUFSIZE)
+            broken_pipe = None
+            try:
+                with tarfile.open(fileobj=proc.stdin, mode="w|",
+                                  bufsize=_COPY_BUFSIZE, copybufsize=_COPY_BUFSIZE) as tf:
+                    tf.add(from_path, arcname=from_path.name)
+                proc.stdin.close()
+            except BrokenPipeError as e:
+                # The compressor exited early; its exit status explains why
+                broken_pipe = e
+            finally:
+                try:
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+                returncode = proc.wait()
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, command)
+        if broken_pipe is not None:
+            raise broken_pipe
+    except BaseException:
+        archive_path.unlink(missing_ok=True)
+        raise
+
+def _make_tar(from_path: Path, archive_path: Path, compression: str, compresslevel: int):
+    """Writes a compressed tar of from_path in-process (gzip levels 0-3 via ISA-L when python-isal is installed)."""
+    # ISA-L only has levels 0-3; higher levels go to zlib so the requested ratio is kept
+    if compression == "gz" and _igzip is not None and compresslevel <= _isal_zlib.ISAL_BEST_COMPRESSION:
+        with _igzip.open(archive_path, "wb", compresslevel=compresslevel) as gz, \
+                tarfile.open(fileobj=gz, mode="w|", bufsize=_COPY_BUFSIZE, copybufsize=_COPY_BUFSIZE) as tf:
+            tf.add(from_path, arcname=from_path.name)
+        return
+    level = {"preset": compresslevel} if compression == "xz" else {"compresslevel": compresslevel}
+    with tarfile.open(archive_path, f"w:{compression}", copybufsize=_COPY_BUFSIZE, **level) as tf:
+        tf.add(from_path, arcname=from_path.name)
+
+# Archive writers take (from_path, base_name, is_dir, owner, group, compresslevel) and return
+# the written archive path, or None to let shutil.make_archive handle the request.
+def _zip_writer(from_path: Path, base_name: Path, is_dir: bool, owner, group, compresslevel: int):
+    archive_path = Path(f"{base_name}.zip")
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    _make_zip(from_path, archive_path, is_dir, compresslevel=compresslevel)
+    return archive_path
+
+def _tar_writer(compression: str, compressor: Optional[str] = None, *args: str):
+    """Builds a compressed-tar writer that pipes through a parallel compressor (with args) when it is installed."""
+    def writer(from_path: Path, base_name: Path, is_dir: bool, owner, group, compresslevel: int):
+        if owner is not None or group is not None:
+            return None
+        archive_path = Path(f"{base_name}.tar.{compression}")
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        if compressor is not None:
+            _make_tar_piped(from_path, archive_path, [compressor, *args, f"-{compresslevel}", "-c"])
+        else:
+            _make_tar(from_path, archive_path, compression, compresslevel)
+        return archive_path
+    return writer
+
+# Multi-threaded compressors, looked up on PATH once
+_PIGZ = sh.which("pigz")
+_PBZIP2 = sh.which("pbzip2")
+_XZ = sh.which("xz")
+
+_ARCHIVE_WRITERS = {
+    "zip": _zip_writer,
+    "gztar": _tar_writer("gz", _PIGZ),
+    "bztar": _tar_writer("bz2", _PBZIP2),
+    "xztar": _tar_writer("xz", _XZ, "-T0"),
+}
+
+# format -> (default, lowest, highest) compresslevel. Deflate defaults to its fastest level;
+# for bz2 the level only sets the block size and xz presets below 6 compress much worse,
+# so those keep the stdlib defaults.
+_COMPRESSLEVELS = {
+    "zip": (1, 0, 9),
+    "gztar": (1, 0, 9),
+    "bztar": (9, 1, 9),
+    "xztar": (6, 0, 9),
+}
+
+def make_archive(from_path: Path, to_path: Path, format: str = "zip", owner: Optional[str] = None, group: Optional[str] = None, compresslevel: Optional[int] = None):
+    """Creates an archive from a directory or file.
+    zip and compressed tar archives use compresslevel (None = per-format default, see _COMPRESSLEVELS);
+    gztar/bztar/xztar are piped through pigz/pbzip2/xz -T0 when they are installed.
+    With owner or group the archive is written by shutil, which has no compresslevel."""
     base_name = to_path.with_suffix('')
-    base_dir = to_path.parent
-    if not from_path.exists():
-        raise FileNotFoundError(f"Directory or file '{from_path}' not found.")
+    levels = _COMPRESSLEVELS.get(format)
+    if levels is not None:
+        default, lowest, highest = levels
+        if compresslevel is None:
+            compresslevel = default
+        elif not lowest <= compresslevel <= highest:
+            raise ValueError(f"compresslevel for '{format}' must be between {lowest} and {highest}, got {compresslevel}.")
+    # shutil would silently write an empty archive for a missing source, so this check stays
+    try:
+        mode = from_path.stat().st_mode
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Directory or file '{from_path}' not found.") from None
+    writer = _ARCHIVE_WRITERS.get(format)
+    if writer is not None and writer(from_path, base_name, statmod.S_ISDIR(mode), owner, group, compresslevel) is not None:
+        return
     sh.make_archive(str(base_name), format,
                     root_dir=str(from_path.parent),
                     base_dir=str(from_path.name),
                     owner=owner, group=group)
 
+# Leading magic bytes -> shutil unpack format
+_ARCHIVE_MAGIC = (
+    (b'PK\x03\x04', 'zip'),
+    (b'PK\x05\x06', 'zip'),  # empty zip
+    (b'\x1f\x8b', 'gztar'),
+    (b'BZh', 'bztar'),
+    (b'\xfd7zXZ\x00', 'xztar'),
+)
+
+def _sniff_archive_format(path: Path) -> Optional[str]:
+    """Guesses the unpack format from the archive's magic bytes; None if unrecognised."""
+    with open(path, 'rb') as f:
+        head = f.read(512)
+    for magic, format in _ARCHIVE_MAGIC:
+        if head.startswith(magic):
+            return format
+    if head[257:262] == b'ustar':
+        return 'tar'
+    return None
+
 def extract_archive(from_path: Path, to_path: Path, format: Optional[str] = None):
-    """Extracts an archive into the specified directory."""
+    """Extracts an archive into the specified directory.
+    Without an explicit format it is detected from the file contents, then from the extension."""
     if not from_path.exists():
         raise FileNotFoundError(f"Archive '{from_path}' not found.")
+    if format is None:
+        format = _sniff_archive_format(from_path)
     if to_path.exists():
         to_path.mkdir(parents=True, exist_ok=True)
     sh.unpack_archive(from_path, to_path, format)
 
 def chmod(path: Path, mode: int):
     """Changes access permissions of a file or directory."""
-    if not path.exists():
-        raise FileNotFoundError(f"Path '{path}' does not exist.")
-    if platform.system() == "Windows":
-        try:
-            if mode & 0o400:
+    try:
+        if _IS_WINDOWS:
+            try:
+                if mode & 0o400:
+                    os.chmod(path, mode)
+                elif not path.exists():
+                    # os.chmod is skipped here, so a missing path has to be reported explicitly
+                    raise FileNotFoundError(path)
+            except FileNotFoundError:
+                raise
+            except Exception:
                 os.chmod(path, mode)
-        except Exception:
+        else:
             os.chmod(path, mode)
-    else:
-        os.chmod(path, mode)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Path '{path}' does not exist.") from None
 
-def nano(path: Path, edit_txt="notepad"):
-    """Opens a file in a text editor."""
+def nano(path: Path, edit_txt: Optional[str] = None, wait: bool = True):
+    """Opens a file in a text editor and returns the editor process.
+    The editor is edit_txt, else $VISUAL/$EDITOR, else notepad (Windows) or nano.
+    With wait=False the editor is left running and the Popen is returned immediately."""
     if not path.exists():
         raise FileNotFoundError(f"File '{path}' not found.")
-    if platform.system() == "Windows":
-        editor_command = ["notepad", str(path)]
-    elif platform.system() == "Linux":
-        editor_command = ["nano", str(path)]
-    elif platform.system() == "Darwin":
-        editor_command = ["nano", str(path)]
+    editor = edit_txt or os.environ.get("VISUAL") or os.environ.get("EDITOR") or _EDITORS.get(_SYSTEM)
+    if editor is None:
+        raise OSError(f"Operating system '{_SYSTEM}' is not supported.")
+    if _IS_WINDOWS:
+        editor_command = f'{editor} "{path}"'
     else:
-        raise OSError(f"Operating system '{platform.system()}' is not supported.")
-    subprocess.run(editor_command, check=True)
+        editor_command = shlex.split(editor) + [str(path)]
+    proc = subprocess.Popen(editor_command)
+    if wait and proc.wait():
+        raise subprocess.CalledProcessError(proc.returncode, editor_command)
+    return proc
 
 def remove(path: Path):
     """Recursively deletes a file or directory."""
@@ -101,49 +333,63 @@ def make(path: Path, is_file: bool = None):
     else:
         path.mkdir(parents=True, exist_ok=True)
 
+# 'rwxrwxrwx'-style strings for every combination of the nine permission bits
+_LS_PERMS = tuple(
+    ''.join(flag if mode & (0o400 >> i) else '-' for i, flag in enumerate('rwxrwxrwx'))
+    for mode in range(0o1000)
+)
+
 def _ls_mode_str(mode):
     # Builds a permission string like 'ls -l'
     is_dir = 'd' if statmod.S_ISDIR(mode) else '-'
-    perm = ''
-    for who in ['USR', 'GRP', 'OTH']:
-        for what in ['R', 'W', 'X']:
-            perm += (mode & getattr(statmod, f'S_I{what}{who}')) and what.lower() or '-'
-    return is_dir + perm
+    return is_dir + _LS_PERMS[mode & 0o777]
 
 def _ls_owner_group(stat):
-    if sys.platform.startswith('win'):
-        import getpass
+    return _ls_account_names(stat.st_uid, stat.st_gid)
+
+@lru_cache(maxsize=1024)
+def _ls_account_names(uid, gid):
+    # Account lookups hit NSS/LSA; most entries share the same owner, so cache per (uid, gid)
+    if _IS_WINDOWS:
         user = getpass.getuser()
         return user, user
     else:
-        import pwd, grp
         try:
-            user = pwd.getpwuid(stat.st_uid).pw_name
+            user = pwd.getpwuid(uid).pw_name
         except Exception:
-            user = str(stat.st_uid)
+            user = str(uid)
         try:
-            group = grp.getgrgid(stat.st_gid).gr_name
+            group = grp.getgrgid(gid).gr_name
         except Exception:
-            group = str(stat.st_gid)
+            group = str(gid)
         return user, group
 
 def _ls_time_str(st_mtime):
     t = time.localtime(st_mtime)
-    return time.strftime("%b %d  %Y", t)
+    return _ls_date_str(t.tm_year, t.tm_mon, t.tm_mday)
+
+@lru_cache(maxsize=4096)
+def _ls_date_str(year, month, day):
+    # Only the date is shown, so strftime runs once per distinct local day
+    return time.strftime("%b %d  %Y", (year, month, day, 0, 0, 0, 0, 1, -1))
 
 def ls(path: Path = Path("."), details: bool = False):
     """Returns a string: list of files separated by spaces or ls -l style listing separated by new lines."""
-    if not details:
-        return " ".join(str(p.name) for p in path.iterdir())
+    with os.scandir(path) as it:
+        if not details:
+            return " ".join(entry.name for entry in it)
+        # normcase keeps the old case-insensitive Path ordering on Windows
+        entries = sorted(it, key=lambda entry: os.path.normcase(entry.name))
     result = []
-    for p in sorted(path.iterdir()):
-        stat = p.stat()
+    for entry in entries:
+        # On Windows DirEntry.stat() always reports st_nlink as 0, so a real stat is needed there
+        stat = os.stat(entry.path) if _IS_WINDOWS else entry.stat()
         mode = _ls_mode_str(stat.st_mode)
         nlink = stat.st_nlink
         user, group = _ls_owner_group(stat)
         size = stat.st_size
         mtime = _ls_time_str(stat.st_mtime)
-        name = p.name
+        name = entry.name
         line = f"{mode} {nlink} {user} {group} {size:>5} {mtime} {name}"
         result.append(line)
     return "\n".join(result)
@@ -1,6 +1,7 @@
 from setuptools import setup, find_packages
 
-
+with open("README.md", "r", encoding="utf-8") as fh:
+    long_description = fh.read()
 
 setup(
     name="FileAlchemy",
@@ -8,7 +9,7 @@ setup(
     author="GimpNiK",
     author_email="reshfizika@mail.ru",
     description="Powerful Python library for file system operations and text processing",
-    long_description=open("README.md").read(),
+    long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/GimpNiK/FileAlchemy",
     packages=find_packages(),